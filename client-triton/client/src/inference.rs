@@ -26,6 +26,8 @@ use crate::utils::config::{InferenceModelType, InferencePrecision};
 // Variables
 pub static INFERENCE_MODELS: OnceCell<HashMap<InferenceModelType, Arc<InferenceModel>>> = OnceCell::const_new();
 pub static GPU_STATS_INTERVAL: Duration = Duration::from_secs(200);
+pub static GPU_STATS_SAMPLE_INTERVAL: Duration = Duration::from_millis(500);
+pub static GPU_STATS_HANDLE: OnceCell<std::thread::JoinHandle<()>> = OnceCell::const_new();
 
 /// Returns the inference model instance, if initiated
 pub fn get_inference_model(model_type: InferenceModelType) -> Result<&'static Arc<InferenceModel>> {
@@ -65,6 +67,87 @@ pub async fn init_inference_models(app_config: &AppConfig) -> Result<()> {
     INFERENCE_MODELS.set(models)
         .map_err(|_| anyhow::anyhow!("Error setting model instances"))?;
 
+    // Monitor GPU stats once for all models
+    init_gpu_stats()
+        .context("Error initiating GPU statistics")?;
+
+    Ok(())
+}
+
+/// Initiates a single background thread that samples GPU statistics
+/// 
+/// GPU utilization is sampled every GPU_STATS_SAMPLE_INTERVAL and reported
+/// every GPU_STATS_INTERVAL as an aggregate of all samples taken in between,
+/// so the reported values reflect the load during the whole interval
+pub fn init_gpu_stats() -> Result<()> {
+    if let Some(_) = GPU_STATS_HANDLE.get() {
+        anyhow::bail!("GPU statistics are already initiated!")
+    }
+
+    let sample_interval = GPU_STATS_SAMPLE_INTERVAL.clone();
+    let report_interval = GPU_STATS_INTERVAL.clone();
+
+    let stats_handle = std::thread::spawn(move || {
+        let samples_capacity = (report_interval.as_millis() / sample_interval.as_millis()) as usize + 1;
+        let mut util_samples: Vec<u32> = Vec::with_capacity(samples_capacity);
+        let mut last_report: Option<Instant> = None;
+
+        // While statistics are unavailable (e.g no NVML on the host), the error is
+        // logged once and retries back off up to the reporting interval
+        let mut failing = false;
+        let mut wait_interval = sample_interval;
+
+        loop {
+            let measure_time = Instant::now();
+
+            // Get GPU statistics
+            let stats_result = utils::get_gpu_statistics();
+
+            match stats_result {
+                Ok(stats) => {
+                    if failing {
+                        tracing::info!("GPU utilization information is available again");
+                        failing = false;
+                        wait_interval = sample_interval;
+                    }
+
+                    util_samples.push(stats.util_perc);
+
+                    // Report once per interval, including the very first sample
+                    let should_report = last_report
+                        .map_or(true, |reported| reported.elapsed() >= report_interval);
+
+                    if should_report {
+                        InferenceModel::process_gpu_stats(stats, &mut util_samples);
+                        util_samples.clear();
+                        last_report = Some(Instant::now());
+                    }
+                },
+                Err(e) => {
+                    if !failing {
+                        tracing::warn!(
+                            error=e.to_string(),
+                            "Error getting GPU utilization information, retrying with backoff"
+                        );
+                        failing = true;
+                    }
+                    wait_interval = (wait_interval * 2).min(report_interval);
+                }
+            };
+
+            // Sleep if time remains
+            let remainder = measure_time.elapsed();
+            if remainder < wait_interval {
+                let duration = wait_interval - remainder;
+                std::thread::sleep(duration);
+            }
+        }
+    });
+
+    // Set global variable
+    GPU_STATS_HANDLE.set(stats_handle)
+        .map_err(|_| anyhow::anyhow!("Error setting GPU statistics handle"))?;
+
     Ok(())
 }
 
@@ -100,8 +183,7 @@ pub struct InferenceModel {
     client: Arc<Client>,
     triton_config: TritonConfig,
     model_config: ModelConfig,
-    base_request: ModelInferRequest,
-    stats_handle: std::thread::JoinHandle<()>
+    base_request: ModelInferRequest
 }
 
 impl InferenceModel {
@@ -109,7 +191,6 @@ impl InferenceModel {
     /// 
     /// Creates a new Triton Server client for inference
     /// Initiate all values for fast inference, including a pre-made request body for inference
-    /// Reports statistics about GPU utilization
     pub async fn new(
         triton_config: TritonConfig,
         model_config: ModelConfig
@@ -156,43 +237,11 @@ impl InferenceModel {
         };
 
 
-        // Spawn seperate task to monitor GPU stats
-        let stats_interval = GPU_STATS_INTERVAL.clone();
-
-        let stats_handle = std::thread::spawn(move || {
-            loop {
-                let measure_time = Instant::now();
-
-                // Get GPU statistics
-                let stats_result = utils::get_gpu_statistics();
-
-                match stats_result {
-                    Ok(stats) => {
-                        InferenceModel::process_gpu_stats(stats);
-                    },
-                    Err(e) => {
-                        tracing::warn!(
-                            error=e.to_string(),
-                            "Error getting GPU utilization information"
-                        )
-                    }
-                };
-
-                // Sleep if time remains
-                let remainder = measure_time.elapsed();
-                if remainder < stats_interval {
-                    let duration = stats_interval - remainder;
-                    std::thread::sleep(duration);
-                }
-            }
-        });
-
         Ok(Self { 
             client: Arc::new(client),
             triton_config,
             model_config,
-            base_request,
-            stats_handle
+            base_request
         })
     }
 
@@ -387,7 +436,23 @@ impl InferenceModel {
         Ok(all_results)
     }
 
-    pub fn process_gpu_stats(stats: GPUStats) {
+    /// Reports GPU statistics, aggregating utilization over the given samples
+    pub fn process_gpu_stats(stats: GPUStats, util_samples: &mut [u32]) {
+        let mut util_perc = stats.util_perc;
+        let mut util_perc_max = stats.util_perc;
+        let mut util_perc_p95 = stats.util_perc;
+
+        if util_samples.len() > 0 {
+            util_samples.sort_unstable();
+
+            let total: u64 = util_samples.iter().map(|&util| util as u64).sum();
+            let p95_index = (util_samples.len() * 95 / 100).min(util_samples.len() - 1);
+
+            util_perc = (total / util_samples.len() as u64) as u32;
+            util_perc_max = util_samples[util_samples.len() - 1];
+            util_perc_p95 = util_samples[p95_index];
+        }
+
         tracing::info!(
             name=stats.name,
             uuid=stats.uuid,
@@ -395,7 +460,10 @@ impl InferenceModel {
             memory_total_mb=stats.memory_total,
             memory_used_mb=stats.memory_used,
             memory_free_mb=stats.memory_free,
-            util_perc=stats.util_perc,
+            util_perc=util_perc,
+            util_perc_max=util_perc_max,
+            util_perc_p95=util_perc_p95,
+            util_samples=util_samples.len(),
             memory_perc=stats.memory_perc,
             "GPU utilization information"
         );
@@ -418,8 +486,4 @@ impl InferenceModel {
     pub fn base_request(&self) -> &ModelInferRequest {
         &self.base_request
     }
-
-    pub fn stats_handle(&self) -> &std::thread::JoinHandle<()> {
-        &self.stats_handle
-    }
 }
\ No newline at end of file
@@ -100,6 +100,7 @@ pub struct SourceStats {
     pub frames_expected: AtomicU64,
     pub frames_success: AtomicU64,
     pub frames_failed: AtomicU64,
+    pub frames_inflight_max: AtomicU64,
     pub total_queue_time: AtomicU64,
     pub total_pre_proc_time: AtomicU64,
     pub total_inference_time: AtomicU64,
@@ -115,6 +116,7 @@ impl SourceStats {
             frames_expected: AtomicU64::new(0),
             frames_success: AtomicU64::new(0),
             frames_failed: AtomicU64::new(0),
+            frames_inflight_max: AtomicU64::new(0),
             total_queue_time: AtomicU64::new(0),
             total_pre_proc_time: AtomicU64::new(0),
             total_inference_time: AtomicU64::new(0),
@@ -129,6 +131,7 @@ impl SourceStats {
         self.frames_expected.store(0, Ordering::Relaxed);
         self.frames_success.store(0, Ordering::Relaxed);
         self.frames_failed.store(0, Ordering::Relaxed);
+        self.frames_inflight_max.store(0, Ordering::Relaxed);
         self.total_queue_time.store(0, Ordering::Relaxed);
         self.total_pre_proc_time.store(0, Ordering::Relaxed);
         self.total_inference_time.store(0, Ordering::Relaxed);
@@ -214,6 +217,11 @@ impl SourceProcessor {
                         Ok(permit) => {
                             // Only pull from queue when we have a permit available
                             if let Some(frame) = process_source_queue.receiver.recv().await {
+                                // Track how many frames are processed concurrently. Frames beyond
+                                // MAX_QUEUE_FRAMES wait in the queue and the oldest are dropped
+                                let frames_inflight = (MAX_QUEUE_FRAMES - process_queue_semaphore.available_permits()) as u64;
+                                process_source_stats.frames_inflight_max.fetch_max(frames_inflight, Ordering::Relaxed);
+
                                 // Move values to the new thread
                                 let process_source_id_ext = Arc::clone(&process_source_id);
                                 let process_source_id_int = Arc::clone(&process_source_id);
@@ -463,6 +471,7 @@ impl SourceProcessor {
         let frames_expected = source_stats.frames_expected.load(Ordering::Relaxed) as u64;
         let frames_success = source_stats.frames_success.load(Ordering::Relaxed) as u64;
         let frames_failed = source_stats.frames_failed.load(Ordering::Relaxed) as u64;
+        let frames_inflight_max = source_stats.frames_inflight_max.load(Ordering::Relaxed) as u64;
         let total_queue_time = source_stats.total_queue_time.load(Ordering::Relaxed) as u64;
         let total_pre_proc_time = source_stats.total_pre_proc_time.load(Ordering::Relaxed) as u64;
         let total_inference_time = source_stats.total_inference_time.load(Ordering::Relaxed) as u64;
@@ -486,6 +495,7 @@ impl SourceProcessor {
             frames_expected=frames_expected,
             frames_success=frames_success,
             frames_failed=frames_failed,
+            frames_inflight_max=frames_inflight_max,
             avg_queue=avg_queue,
             avg_pre_proc=avg_pre_proc,
             avg_inference=avg_inference,
@@ -1,12 +1,16 @@
 use image::{ImageReader, GenericImageView};
 use anyhow::{Result, Context};
 use nvml_wrapper::Nvml;
+use once_cell::sync::OnceCell;
 
 // Custom modules
 pub mod config;
 pub mod kafka;
 pub mod queue;
 
+// Variables
+pub static NVML: OnceCell<Nvml> = OnceCell::new();
+
 /// Represents GPU statistics that are reported by the application
 pub struct GPUStats {
     pub name: String,
@@ -36,10 +40,19 @@ pub fn get_image_raw(path: &str) -> Result<(Vec<u8>, u32, u32)> {
     Ok((img_rgb8.into_raw(), height, width))
 }
 
+/// Returns the NVML instance, initiating it once on first use
+/// 
+/// Initiating NVML loads the driver library and enumerates devices, so we keep
+/// a single instance for the lifetime of the application instead of paying
+/// that cost on every statistics sample
+pub fn get_nvml() -> Result<&'static Nvml> {
+    NVML.get_or_try_init(|| Nvml::init())
+        .context("Error initiating NVML wrapper")
+}
+
 /// Returns the name of the NVIDIA GPU installed on the machine
 pub fn get_gpu_name() -> Result<String> {
-    let nvml = Nvml::init()
-        .context("Error initiating NVML wrapper")?;
+    let nvml = get_nvml()?;
     let device = nvml.device_by_index(0)
         .context("Error getting GPU ID 0 device")?;
     Ok(
@@ -51,8 +64,7 @@ pub fn get_gpu_name() -> Result<String> {
 
 /// Returns statistics about the NVIDIA GPU installed on the machine
 pub fn get_gpu_statistics() -> Result<GPUStats> {
-    let nvml = Nvml::init()
-        .context("Error initiating NVML wrapper")?;
+    let nvml = get_nvml()?;
     let device = nvml.device_by_index(0)
         .context("Error getting GPU ID 0 device")?;
 
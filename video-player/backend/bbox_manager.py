@@ -1,37 +1,75 @@
 from fastapi import HTTPException
-from storage import storage
+from storage import storage, VideoBBoxes
 from models import BBoxCreate
+from collections import defaultdict
+import asyncio
 import time
 
+# Wall clock in milliseconds, refreshed by BBoxManager.run_clock
+_now_ms_cache = [0]
+
 class BBoxManager:
     """Handles bounding box operations with raw PTS, retention, and WebSocket broadcasting"""
     
     # Retention period in milliseconds (5 minutes)
     RETENTION_PERIOD_MS = 5 * 60 * 1000
     
-    # Standard MPEG-TS time base for converting PTS to milliseconds
-    STANDARD_TIME_BASE = 90000.0
+    # Expired bboxes are dropped in whole slices of this duration (10 seconds)
+    RETENTION_CHUNK_MS = 10 * 1000
+    
+    # Minimum time between retention cleanups of the same video (5 seconds)
+    CLEANUP_INTERVAL_MS = 5 * 1000
+    
+    # Standard MPEG-TS time base (90kHz) expressed in PTS ticks per millisecond
+    PTS_TICKS_PER_MS = 90
+    
+    # Refresh interval of the cached wall clock in seconds
+    CLOCK_TICK_S = 0.05
+    
+    # Lifetime of a cached bbox query result in milliseconds
+    QUERY_CACHE_TTL_MS = 1000
+    
+    # Maximum number of cached bbox query results per video
+    QUERY_CACHE_SIZE = 64
     
     @staticmethod
-    def _pts_to_ms(pts: int) -> int:
-        """Convert raw PTS to milliseconds using standard time base"""
-        return int((pts / BBoxManager.STANDARD_TIME_BASE) * 1000)
+    def _now_ms() -> int:
+        """Get the cached wall clock in milliseconds, reading it directly if the clock task is not running"""
+        return _now_ms_cache[0] or int(time.time() * 1000)
     
     @staticmethod
-    def _cleanup_old_bboxes(video_id: int, current_time_ms: int):
+    async def run_clock():
+        """Refresh the cached wall clock until cancelled"""
+        try:
+            while True:
+                _now_ms_cache[0] = int(time.time() * 1000)
+                await asyncio.sleep(BBoxManager.CLOCK_TICK_S)
+        finally:
+            _now_ms_cache[0] = 0
+    
+    @staticmethod
+    def _cleanup_old_bboxes(video_bboxes: VideoBBoxes, current_time_ms: int):
         """Remove bboxes older than retention period based on absolute time"""
-        if video_id not in storage.bboxes:
+        video_bboxes.last_cleanup_ms = current_time_ms
+        
+        if video_bboxes.stream_start_time_ms is None:
             return
         
+        # Align the cutoff down to a chunk boundary so entries expire a whole
+        # slice at a time, instead of a few on every insert
         cutoff_time = current_time_ms - BBoxManager.RETENTION_PERIOD_MS
+        cutoff_time -= cutoff_time % BBoxManager.RETENTION_CHUNK_MS
         
-        pts_to_remove = []
-        for pts, bbox_list in storage.bboxes[video_id].items():
-            if bbox_list and bbox_list[0].get("absolute_timestamp_ms", 0) < cutoff_time:
-                pts_to_remove.append(pts)
+        # Express the cutoff as a PTS of the stream the bboxes were added for
+        cutoff_pts = (cutoff_time - video_bboxes.stream_start_time_ms) * BBoxManager.PTS_TICKS_PER_MS
         
-        for pts in pts_to_remove:
-            del storage.bboxes[video_id][pts]
+        # Entries are ordered by PTS, so expired entries can only be at the start
+        pts_with_bboxes = video_bboxes.entries
+        expired_count = pts_with_bboxes.bisect_left(cutoff_pts)
+        if expired_count > 0:
+            del pts_with_bboxes.keys()[:expired_count]
+            # Cached results may reference the expired bboxes, drop them so they are freed
+            video_bboxes.query_cache.clear()
     
     @staticmethod
     async def add_bboxes(bbox_data: BBoxCreate, websocket_manager=None) -> dict:
@@ -39,66 +77,64 @@ class BBoxManager:
         
         video_id = bbox_data.stream_id
         
-        if video_id not in storage.videos:
+        # A single lookup per request, the video's bbox context exists for
+        # as long as the video does
+        video_bboxes = storage.bboxes.get(video_id)
+        if video_bboxes is None:
             raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
         
-        if video_id not in storage.active_streams:
+        stream_data = storage.active_streams.get(video_id)
+        if stream_data is None:
             raise HTTPException(status_code=400, detail=f"Video {video_id} is not currently streaming")
         
-        stream_start_time_ms = storage.active_streams[video_id]['start_time_ms']
-        
-        if video_id not in storage.bboxes:
-            storage.bboxes[video_id] = {}
+        stream_start_time_ms = stream_data['start_time_ms']
+        if video_bboxes.stream_start_time_ms != stream_start_time_ms:
+            # PTS restart with a new stream session, bboxes of the previous one
+            # cannot be ordered or expired against it
+            video_bboxes.entries.clear()
+            video_bboxes.query_cache.clear()
+            video_bboxes.stream_start_time_ms = stream_start_time_ms
+        pts_with_bboxes = video_bboxes.entries
         
         added_count = 0
-        current_time_ms = int(time.time() * 1000)
+        current_time_ms = BBoxManager._now_ms()
         
-        # Group bboxes by PTS for efficient broadcasting
-        pts_groups = {}
+        # Group bboxes by PTS first, so each PTS entry is extended in bulk
+        # rather than one bbox at a time
+        pts_groups = defaultdict(list)
         
         for bbox in bbox_data.bboxes:
-            pts = bbox.pts
-            pts_ms = BBoxManager._pts_to_ms(pts)
-            absolute_timestamp_ms = stream_start_time_ms + pts_ms
-            
-            if pts not in storage.bboxes[video_id]:
-                storage.bboxes[video_id][pts] = []
-            
-            bbox_dict = {
-                "pts": pts,
-                "absolute_timestamp_ms": absolute_timestamp_ms,
-                "top_left_corner": bbox.top_left_corner,
-                "bottom_right_corner": bbox.bottom_right_corner,
-                "class_name": bbox.class_name,
-                "confidence": bbox.confidence
-            }
-            
-            storage.bboxes[video_id][pts].append(bbox_dict)
-            added_count += 1
-            
-            # Group for broadcasting
-            if pts not in pts_groups:
-                pts_groups[pts] = []
-            pts_groups[pts].append(bbox_dict)
+            pts_groups[bbox.pts].append(bbox)
         
-        # Cleanup old bboxes
-        BBoxManager._cleanup_old_bboxes(video_id, current_time_ms)
+        # The decoded BBoxData structs are stored and broadcast as is, they are
+        # compact and immutable, and are encoded by msgspec at the boundaries
+        for pts, bboxes in pts_groups.items():
+            pts_with_bboxes.setdefault(pts, []).extend(bboxes)
+            added_count += len(bboxes)
         
-        # Broadcast to WebSocket clients
+        if pts_groups and video_bboxes.query_cache:
+            BBoxManager._invalidate_queries(video_bboxes, min(pts_groups), max(pts_groups))
+        
+        # Cleanup old bboxes, at most once per cleanup interval
+        if current_time_ms - video_bboxes.last_cleanup_ms > BBoxManager.CLEANUP_INTERVAL_MS:
+            BBoxManager._cleanup_old_bboxes(video_bboxes, current_time_ms)
+        
+        # Broadcast all PTS groups to WebSocket clients in a single message
         if websocket_manager:
-            for pts, bboxes in pts_groups.items():
-                await websocket_manager.broadcast_bboxes(video_id, {
-                    "type": "bboxes",
-                    "video_id": video_id,
-                    "pts": pts,
-                    "bboxes": bboxes,
-                    "timestamp": current_time_ms
-                })
+            await websocket_manager.broadcast_bboxes(video_id, {
+                "type": "bboxes_batch",
+                "video_id": video_id,
+                "timestamp": current_time_ms,
+                "groups": [
+                    {"pts": pts, "bboxes": bboxes}
+                    for pts, bboxes in pts_groups.items()
+                ]
+            })
         
         return {
             "video_id": video_id,
             "added_count": added_count,
-            "remaining_pts_count": len(storage.bboxes[video_id]),
+            "remaining_pts_count": len(pts_with_bboxes),
             "retention_period_ms": BBoxManager.RETENTION_PERIOD_MS,
             "stream_start_time_ms": stream_start_time_ms,
             "websocket_clients": websocket_manager.get_connection_count(video_id) if websocket_manager else 0,
@@ -108,57 +144,133 @@ class BBoxManager:
 
     
     @staticmethod
-    def get_all_bboxes_for_video(video_id: int, limit: int = None) -> dict:
-        """Get all bounding boxes for a video (within retention period), optionally limited to the last X bboxes"""
+    def get_all_bboxes_for_video(
+        video_id: int,
+        limit: int = None,
+        from_pts: int = None,
+        to_pts: int = None,
+        offset: int = 0,
+        summary_only: bool = False
+    ) -> dict:
+        """Get all bounding boxes for a video (within retention period), optionally within a PTS range and limited to the last X bboxes"""
         
-        if video_id not in storage.videos:
+        video_bboxes = storage.bboxes.get(video_id)
+        if video_bboxes is None:
             raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
         
-        pts_with_bboxes = storage.bboxes.get(video_id, {})
+        # Clients re-poll the same window repeatedly, so results are reused for a
+        # short time, until bboxes are added within the queried window
+        current_time_ms = BBoxManager._now_ms()
+        query_cache = video_bboxes.query_cache
+        key = (limit, from_pts, to_pts, offset, summary_only)
         
-        all_pts = []
-        for pts, bboxes_list in pts_with_bboxes.items():
-            all_pts.append({
-                "pts": pts,
-                "bboxes": bboxes_list
-            })
+        cached = query_cache.get(key)
+        if cached is not None and cached[0] > current_time_ms:
+            return cached[1]
         
-        all_pts.sort(key=lambda x: x["pts"])
+        result = BBoxManager._query_bboxes(
+            video_id, video_bboxes, limit, from_pts, to_pts, offset, summary_only
+        )
         
-        # Apply limit if specified (get the last X bboxes)
-        if limit is not None and limit > 0:
-            all_pts = all_pts[-limit:]
+        if len(query_cache) >= BBoxManager.QUERY_CACHE_SIZE:
+            for cached_key, (expires_ms, _) in list(query_cache.items()):
+                if expires_ms <= current_time_ms:
+                    del query_cache[cached_key]
+            if len(query_cache) >= BBoxManager.QUERY_CACHE_SIZE:
+                query_cache.clear()
+        query_cache[key] = (current_time_ms + BBoxManager.QUERY_CACHE_TTL_MS, result)
         
-        oldest_pts = min(pts_with_bboxes.keys()) if pts_with_bboxes else None
-        newest_pts = max(pts_with_bboxes.keys()) if pts_with_bboxes else None
+        return result
+    
+    @staticmethod
+    def _invalidate_queries(video_bboxes: VideoBBoxes, min_pts: int, max_pts: int):
+        """Drop cached queries whose results change with bboxes added between min_pts and max_pts"""
+        query_cache = video_bboxes.query_cache
+        for key in list(query_cache):
+            limit, from_pts, to_pts, offset, summary_only = key
+            # Summaries change with any insert, PTS ranges (open-ended ones included)
+            # only when the new bboxes fall inside them
+            if summary_only or (
+                (from_pts is None or from_pts <= max_pts) and (to_pts is None or to_pts >= min_pts)
+            ):
+                del query_cache[key]
+    
+    @staticmethod
+    def _query_bboxes(
+        video_id: int,
+        video_bboxes: VideoBBoxes,
+        limit: int,
+        from_pts: int,
+        to_pts: int,
+        offset: int,
+        summary_only: bool
+    ) -> dict:
+        """Query the bounding boxes of a video"""
+        pts_with_bboxes = video_bboxes.entries
         
-        return {
+        # Oldest and newest PTS are the ends of the sorted keys, O(1)
+        oldest_pts = pts_with_bboxes.keys()[0] if pts_with_bboxes else None
+        newest_pts = pts_with_bboxes.keys()[-1] if pts_with_bboxes else None
+        
+        summary = {
             "video_id": video_id,
             "total_pts_count": len(pts_with_bboxes),
-            "returned_count": len(all_pts),
             "oldest_pts": oldest_pts,
             "newest_pts": newest_pts,
-            "retention_period_ms": BBoxManager.RETENTION_PERIOD_MS,
+            "retention_period_ms": BBoxManager.RETENTION_PERIOD_MS
+        }
+        
+        if summary_only:
+            return summary
+        
+        # Entries are kept ordered by PTS, so the PTS range and the last X
+        # entries within it are located by binary search without touching the rest
+        start = pts_with_bboxes.bisect_left(from_pts) if from_pts is not None else 0
+        stop = pts_with_bboxes.bisect_right(to_pts) if to_pts is not None else len(pts_with_bboxes)
+        
+        # Offset skips the most recent entries, for paging back from the newest
+        if offset > 0:
+            stop = max(stop - offset, start)
+        
+        if limit is not None and limit > 0:
+            start = max(stop - limit, start)
+        
+        pts_keys = pts_with_bboxes.islice(start, stop)
+        
+        all_pts = []
+        for pts in pts_keys:
+            all_pts.append({
+                "pts": pts,
+                # Copied, results may be cached while the stored list is extended
+                "bboxes": list(pts_with_bboxes[pts])
+            })
+        
+        return {
+            **summary,
+            "returned_count": len(all_pts),
             "limit_applied": limit,
+            "offset": offset,
+            "from_pts": from_pts,
+            "to_pts": to_pts,
             "results": all_pts
         }
     
     @staticmethod
     def cleanup_all_old_bboxes():
         """Manually trigger cleanup for all videos"""
-        current_time_ms = int(time.time() * 1000)
+        current_time_ms = BBoxManager._now_ms()
         cleaned_videos = 0
         total_removed = 0
         
-        for video_id in list(storage.bboxes.keys()):
+        for video_id, video_bboxes in list(storage.bboxes.items()):
             if video_id not in storage.videos:
                 del storage.bboxes[video_id]
                 cleaned_videos += 1
                 continue
             
-            initial_count = len(storage.bboxes[video_id])
-            BBoxManager._cleanup_old_bboxes(video_id, current_time_ms)
-            removed_count = initial_count - len(storage.bboxes[video_id])
+            initial_count = len(video_bboxes.entries)
+            BBoxManager._cleanup_old_bboxes(video_bboxes, current_time_ms)
+            removed_count = initial_count - len(video_bboxes.entries)
             
             if removed_count > 0:
                 cleaned_videos += 1
@@ -8,17 +8,21 @@ from routers import videos, streams, bboxes
 from storage import storage
 from stream_manager import StreamManager
 from websocket_manager import manager as ws_manager
+from bbox_manager import BBoxManager
+from responses import MsgspecJSONResponse
+import asyncio
 import shutil
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Cleanup on shutdown"""
+    """Start background tasks, cleanup on shutdown"""
+    clock_task = asyncio.create_task(BBoxManager.run_clock())
+    await StreamManager.probe_ffmpeg()
+    
     yield
-    for video_id in list(storage.active_streams.keys()):
-        try:
-            StreamManager.stop_stream(video_id)
-        except:
-            pass
+    
+    clock_task.cancel()
+    await StreamManager.cleanup_all_streams()
     
     if storage.video_storage_path.exists():
         try:
@@ -39,7 +43,8 @@ app = FastAPI(
     title="Video Stream Management API",
     description="API for managing video streams with DASH and real-time bbox WebSocket support",
     version="3.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=MsgspecJSONResponse
 )
 
 app.add_middleware(
@@ -82,7 +87,7 @@ async def serve_dash_file(video_id: int, filename: str):
     )
 
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "Video Stream Management API with DASH and WebSocket",
         "docs": "/docs",
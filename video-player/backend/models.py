@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+import msgspec
+from typing import Annotated, Optional, List
 from datetime import datetime
 
 class VideoCreate(BaseModel):
@@ -15,14 +16,14 @@ class VideoInfo(BaseModel):
     height: int
     fps: float
 
-class BBoxData(BaseModel):
-    pts: int = Field(..., description="Presentation timestamp in milliseconds from video start")
-    top_left_corner: int = Field(..., description="Top left corner of bbox - pixel index number")
-    bottom_right_corner: int = Field(..., description="Bottom right corner of bbox - pixel index number")
-    class_name: str = Field(..., description="Object class name")
-    confidence: float = Field(..., ge=0, le=1, description="Detection confidence")
+class BBoxData(msgspec.Struct, frozen=True):
+    pts: int  # Presentation timestamp in milliseconds from video start
+    top_left_corner: int  # Top left corner of bbox - pixel index number
+    bottom_right_corner: int  # Bottom right corner of bbox - pixel index number
+    class_name: str  # Object class name
+    confidence: Annotated[float, msgspec.Meta(ge=0, le=1)]  # Detection confidence
 
-class BBoxCreate(BaseModel):
+class BBoxCreate(msgspec.Struct, frozen=True):
     stream_id: int
     bboxes: List[BBoxData]
 
@@ -0,0 +1,9 @@
+from fastapi.responses import JSONResponse
+from typing import Any
+import msgspec
+
+class MsgspecJSONResponse(JSONResponse):
+    """JSON response encoded with msgspec, also supports msgspec structs"""
+    
+    def render(self, content: Any) -> bytes:
+        return msgspec.json.encode(content)
\ No newline at end of file
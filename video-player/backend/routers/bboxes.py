@@ -1,24 +1,51 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from models import BBoxCreate
 from bbox_manager import BBoxManager
 from websocket_manager import manager as ws_manager
+from responses import MsgspecJSONResponse
+import msgspec
 
 router = APIRouter(prefix="/bboxes", tags=["bboxes"])
 
+# Type-specialized decoder for the bbox hot path, bypassing pydantic validation
+bbox_create_decoder = msgspec.json.Decoder(BBoxCreate)
+
 @router.post("/")
-async def add_bboxes(bbox_data: BBoxCreate):
+async def add_bboxes(request: Request):
     """Add bounding boxes for a specific PTS and broadcast via WebSocket"""
+    try:
+        bbox_data = bbox_create_decoder.decode(await request.body())
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+    
     return await BBoxManager.add_bboxes(bbox_data, websocket_manager=ws_manager)
 
 @router.get("/{video_id}")
-def get_all_bboxes(
+async def get_all_bboxes(
     video_id: int,
-    limit: int = Query(None, description="Limit the number of most recent bboxes to return")
+    limit: int = Query(None, description="Limit the number of most recent bboxes to return"),
+    from_pts: int = Query(None, description="Only return bboxes with PTS greater than or equal to this value"),
+    to_pts: int = Query(None, description="Only return bboxes with PTS less than or equal to this value"),
+    offset: int = Query(0, ge=0, description="Skip this number of most recent bboxes, for paging back from the newest"),
+    summary_only: bool = Query(False, description="Only return counts and PTS bounds, without the bboxes")
 ):
-    """Get all bounding boxes for a video (within retention period), optionally limited to the last X bboxes"""
-    return BBoxManager.get_all_bboxes_for_video(video_id, limit=limit)
+    """Get all bounding boxes for a video (within retention period), optionally within a PTS range and limited to the last X bboxes"""
+    # Runs on the event loop like add_bboxes and the retention cleanup, so the
+    # bboxes are never read while they are being modified
+    # Stored bboxes are msgspec structs, so the response is returned directly
+    # to skip FastAPI's jsonable_encoder pass
+    return MsgspecJSONResponse(BBoxManager.get_all_bboxes_for_video(
+        video_id,
+        limit=limit,
+        from_pts=from_pts,
+        to_pts=to_pts,
+        offset=offset,
+        summary_only=summary_only
+    ))
 
 @router.post("/cleanup")
-def cleanup_old_bboxes():
+async def cleanup_old_bboxes():
     """Manually trigger cleanup of old bboxes across all videos"""
     return BBoxManager.cleanup_all_old_bboxes()
\ No newline at end of file
@@ -7,9 +7,9 @@ from stream_manager import StreamManager
 router = APIRouter(prefix="/streams", tags=["streams"])
 
 @router.post("/start")
-def start_stream(config: StreamConfig):
+async def start_stream(config: StreamConfig):
     """Start streaming a video"""
-    return StreamManager.start_stream(config.video_id)
+    return await StreamManager.start_stream(config.video_id)
 
 @router.post("/stop/{video_id}")
 async def stop_stream(video_id: int):
@@ -17,6 +17,6 @@ async def stop_stream(video_id: int):
     return await StreamManager.stop_stream(video_id)
 
 @router.get("/status/{video_id}")
-def get_stream_status(video_id: int):
+async def get_stream_status(video_id: int):
     """Get stream status"""
-    return StreamManager.get_stream_status(video_id)
\ No newline at end of file
+    return await StreamManager.get_stream_status(video_id)
\ No newline at end of file
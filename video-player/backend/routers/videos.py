@@ -16,16 +16,16 @@ async def upload_video(
     return await VideoManager.create_video(file, name or file.filename)
 
 @router.get("/{video_id}", response_model=VideoInfo)
-def get_video(video_id: int):
+async def get_video(video_id: int):
     """Get video by ID"""
     return VideoManager.get_video(video_id)
 
 @router.get("/", response_model=list[VideoInfo])
-def list_videos():
+async def list_videos():
     """List all videos"""
     return VideoManager.list_videos()
 
 @router.delete("/{video_id}")
-def delete_video(video_id: int):
+async def delete_video(video_id: int):
     """Delete a video"""
     return VideoManager.delete_video(video_id)
\ No newline at end of file
@@ -1,6 +1,18 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import subprocess
 from pathlib import Path
+from sortedcontainers import SortedDict
+
+class VideoBBoxes:
+    """Bounding boxes of a single video and their retention state"""
+    
+    __slots__ = ("entries", "stream_start_time_ms", "last_cleanup_ms", "query_cache")
+    
+    def __init__(self):
+        self.entries: SortedDict = SortedDict()  # {pts: [BBoxData]} ordered by pts
+        self.stream_start_time_ms: Optional[int] = None  # Start time of the stream bboxes were added for
+        self.last_cleanup_ms: int = 0
+        self.query_cache: dict = {}  # {query params: (expires_ms, result)} of recent bbox queries
 
 class Storage:
     """In-memory storage for videos, streams, and bounding boxes"""
@@ -8,7 +20,7 @@ class Storage:
     def __init__(self):
         self.videos: Dict[int, dict] = {}
         self.active_streams: Dict[int, subprocess.Popen] = {}
-        self.bboxes: Dict[int, Dict[int, List[dict]]] = {}  # {video_id: {pts: [bbox_data]}}
+        self.bboxes: Dict[int, VideoBBoxes] = {}
         self.next_video_id: int = 1
         self.video_storage_path = Path("./videos")
         self.video_storage_path.mkdir(exist_ok=True)
@@ -2,8 +2,13 @@ import subprocess
 import signal
 import time
 import threading
+import asyncio
+import shutil
 import logging
 import os
+from functools import lru_cache
+import re
+import selectors
 from pathlib import Path
 from fastapi import HTTPException
 from storage import storage
@@ -13,8 +18,17 @@ from tcp_relay import TCPRelay
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Classifies FFmpeg stderr lines: any "error" except the benign configuration
+# and "0 decode errors" lines, otherwise "warning"
+FFMPEG_STDERR_LEVEL_RE = re.compile(
+    rb'(?i)^(?!.*(?:configuration:|0 decode errors))(?P<error>.*error)|(?P<warning>warning)'
+)
+
 class StreamManager:
-    """Handles FFmpeg streaming with DASH output and TCP Relay for AI"""
+    """
+    Handles FFmpeg streaming with DASH output and TCP Relay for AI.
+    Linux only, FFmpeg is signalled and watched through pidfds.
+    """
     
     DASH_OUTPUT_DIR = Path("./dash_streams")
     TCP_EXTERNAL_BASE_PORT = 9000  # Base port for external clients (AI) - TCP
@@ -24,10 +38,41 @@ class StreamManager:
     DASH_SEGMENT_DURATION = 2  # seconds
     DASH_WINDOW_SIZE = 5  # keep last 5 segments
     
-    _stderr_threads = {}
+    # Encoder thread budget, the CPU cores are split between the expected number of
+    # concurrent streams instead of every FFmpeg spawning one thread per core.
+    # Only sizes the budget, more streams can still start and then share the cores
+    EXPECTED_CONCURRENT_STREAMS = 4
+    THREADS_PER_STREAM = max(1, (os.cpu_count() or 1) // EXPECTED_CONCURRENT_STREAMS)
+    
+    # Hardware H.264 encoders tried in order before falling back to libx264, with
+    # the filters appended to the frame rate filter and the options replacing the libx264 ones
+    HW_ENCODERS = {
+        "h264_nvenc": ("", ("-pix_fmt", "yuv420p", "-preset", "p4", "-tune", "ll", "-rc", "cbr", "-zerolatency", "1")),
+        "h264_vaapi": (",format=nv12,hwupload", ("-init_hw_device", "vaapi=va:/dev/dri/renderD128", "-filter_hw_device", "va")),
+        "h264_qsv": ("", ("-pix_fmt", "nv12", "-preset", "veryfast", "-look_ahead", "0")),
+    }
+    ENCODER_PROBE_TIMEOUT = 10  # seconds
+    
+    # Position of the per-stream output in the FFmpeg argument template,
+    # the input follows the template's "-i"
+    FFMPEG_OUTPUT_INDEX = -1
+    
+    # Stream startup readiness settings
+    STARTUP_TIMEOUT = 3  # seconds
+    STARTUP_POLL_INTERVAL = 0.05  # seconds
+    
+    # Watchdog settings, for restarting FFmpeg when it dies while clients are connected
+    WATCHDOG_MAX_RESTARTS = 3
+    WATCHDOG_STABLE_PERIOD = 60  # seconds, a run this long resets the restart count
+    
+    _stderr_selector = selectors.DefaultSelector()  # All FFmpeg stderr pipes, drained by one thread
+    _stderr_reaper = None
+    _stderr_reaper_lock = threading.Lock()
     _stream_locks = {}
     _client_counts = {}
     _relays = {} # Store active TCPRelay instances
+    _removal_tasks = set() # Keep background directory removals referenced until done
+    _watchdogs = {} # Store active stream watchdog tasks
     
     def __init__(self):
         self.DASH_OUTPUT_DIR.mkdir(exist_ok=True)
@@ -41,45 +86,275 @@ class StreamManager:
         )
     
     @staticmethod
-    def _get_lock(video_id: int) -> threading.Lock:
-        if video_id not in StreamManager._stream_locks:
-            StreamManager._stream_locks[video_id] = threading.Lock()
-        return StreamManager._stream_locks[video_id]
+    def _get_lock(video_id: int) -> asyncio.Lock:
+        # Locks are awaited on the event loop, blocking work is offloaded to threads
+        return StreamManager._stream_locks.setdefault(video_id, asyncio.Lock())
     
     @staticmethod
-    def _consume_stderr(video_id: int, process):
-        """Consume stderr and terminate stream on ANY error"""
-        logger.info(f"[Stream {video_id}] Starting stderr consumer thread")
+    def _remove_dash_dir(path: Path):
+        """Remove a DASH output directory, which only holds files"""
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+                    except IsADirectoryError:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+            os.rmdir(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+    
+    @staticmethod
+    def _schedule_dir_removal(path: Path):
+        """Remove a DASH directory in a worker thread without waiting for it"""
+        task = asyncio.create_task(asyncio.to_thread(StreamManager._remove_dash_dir, path))
+        StreamManager._removal_tasks.add(task)
+        task.add_done_callback(StreamManager._removal_tasks.discard)
+    
+    @staticmethod
+    def _signal_process(process, sig: int):
+        """
+        Signal FFmpeg through a pidfd. The pidfd is checked against the unreaped
+        child after opening, so a process that reused the PID is never signalled.
+        """
+        pidfd = os.pidfd_open(process.pid)
+        try:
+            if process.poll() is None:
+                signal.pidfd_send_signal(pidfd, sig)
+        finally:
+            os.close(pidfd)
+    
+    @staticmethod
+    async def _wait_process_exit(process):
+        """Wait until FFmpeg exits, woken by its pidfd instead of polling"""
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except ProcessLookupError:
+            return
         
         try:
-            for line in iter(process.stderr.readline, b''):
-                if not line:
-                    break
-                    
-                line_str = line.decode('utf-8', errors='ignore').strip()
+            if process.poll() is not None:
+                return
+            
+            # A pidfd becomes readable once the process exits
+            loop = asyncio.get_running_loop()
+            exited = loop.create_future()
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+        finally:
+            os.close(pidfd)
+    
+    @staticmethod
+    def _watch_stderr(video_id: int, process):
+        """Register a stream's stderr with the shared stderr reaper thread"""
+        with StreamManager._stderr_reaper_lock:
+            if StreamManager._stderr_reaper is None:
+                StreamManager._stderr_reaper = threading.Thread(
+                    target=StreamManager._reap_stderr,
+                    daemon=True
+                )
+                StreamManager._stderr_reaper.start()
+        
+        StreamManager._stderr_selector.register(
+            process.stderr.fileno(),
+            selectors.EVENT_READ,
+            {"video_id": video_id, "process": process, "buffer": b'', "terminated": False}
+        )
+        logger.info(f"[Stream {video_id}] Stderr registered with reaper")
+    
+    @staticmethod
+    def _reap_stderr():
+        """Drain stderr of all FFmpeg processes from a single thread"""
+        logger.info("Starting stderr reaper thread")
+        
+        while True:
+            try:
+                events = StreamManager._stderr_selector.select(timeout=1)
+            except Exception as e:
+                logger.error(f"Stderr reaper select failed: {e}")
+                time.sleep(1)
+                continue
+            
+            for key, _ in events:
+                state = key.data
+                try:
+                    chunk = os.read(key.fd, 65536)
+                except OSError:
+                    chunk = b''
                 
-                # Log all output at DEBUG level
-                logger.debug(f"[Stream {video_id}] FFmpeg: {line_str}")
+                if not chunk:
+                    # Process exited, flush the last partial line
+                    if state["buffer"]:
+                        StreamManager._handle_stderr_line(state, state["buffer"])
+                    StreamManager._stderr_selector.unregister(key.fd)
+                    logger.info(f"[Stream {state['video_id']}] Stderr reached EOF, unregistered from reaper")
+                    continue
                 
-                # Check for ANY error - terminate immediately
-                if 'error' in line_str.lower() and 'configuration:' not in line_str.lower() and '0 decode errors' not in line_str.lower():
-                    logger.error(f"[Stream {video_id}] ERROR detected, terminating stream: {line_str}")
-                    try:
-                        # Terminate the process immediately
-                        pgid = os.getpgid(process.pid)
-                        os.killpg(pgid, signal.SIGTERM)
-                        logger.info(f"[Stream {video_id}] Sent SIGTERM to process group")
-                    except (ProcessLookupError, OSError) as e:
-                        logger.warning(f"[Stream {video_id}] Could not terminate process: {e}")
-                    break
-                elif 'warning' in line_str.lower():
-                    logger.warning(f"[Stream {video_id}] FFmpeg warning: {line_str}")
-                    
-        except Exception as e:
-            # This can happen normally when process is killed
-            logger.info(f"[Stream {video_id}] Stderr consumer thread finished: {e}")
-        finally:
-            logger.info(f"[Stream {video_id}] Stderr consumer thread stopped")
+                *lines, state["buffer"] = (state["buffer"] + chunk).split(b'\n')
+                for line in lines:
+                    StreamManager._handle_stderr_line(state, line)
+    
+    @staticmethod
+    def _handle_stderr_line(state: dict, line: bytes):
+        """Log an FFmpeg stderr line and terminate the stream on ANY error"""
+        video_id = state["video_id"]
+        process = state["process"]
+        
+        # Log all output at DEBUG level
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Stream {video_id}] FFmpeg: {line.decode('utf-8', errors='ignore').strip()}")
+        
+        # Classify the raw line in a single regex pass
+        match = FFMPEG_STDERR_LEVEL_RE.search(line)
+        if match is None or state["terminated"]:
+            return
+        
+        line_str = line.decode('utf-8', errors='ignore').strip()
+        
+        # Check for ANY error - terminate immediately
+        if match.group('error') is not None:
+            logger.error(f"[Stream {video_id}] ERROR detected, terminating stream: {line_str}")
+            state["terminated"] = True
+            try:
+                # Terminate the process immediately
+                StreamManager._signal_process(process, signal.SIGTERM)
+                logger.info(f"[Stream {video_id}] Sent SIGTERM to process")
+            except (ProcessLookupError, OSError) as e:
+                logger.warning(f"[Stream {video_id}] Could not terminate process: {e}")
+        else:
+            logger.warning(f"[Stream {video_id}] FFmpeg warning: {line_str}")
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _dash_tee_options() -> str:
+        """Build the DASH output options of the tee muxer"""
+        return (
+            f"f=dash"
+            f":seg_duration={StreamManager.DASH_SEGMENT_DURATION}"
+            f":window_size={StreamManager.DASH_WINDOW_SIZE}"
+            f":extra_window_size={StreamManager.DASH_WINDOW_SIZE}"
+            f":streaming=1"
+            f":ldash=1"
+        )
+    
+    @staticmethod
+    async def probe_ffmpeg():
+        """
+        Probe the FFmpeg features once at startup, instead of on the first
+        stream start while its lock is held
+        """
+        def probe():
+            StreamManager._input_pacing_args()
+            StreamManager._video_encoder_args()
+        
+        await asyncio.to_thread(probe)
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _input_pacing_args() -> tuple:
+        """Pick the input pacing once, -readrate_initial_burst needs FFmpeg 6.1 or newer"""
+        # Real-time pacing, with the first segment read at once so startup is not paced
+        burst_args = ("-readrate", "1", "-readrate_initial_burst", str(StreamManager.DASH_SEGMENT_DURATION))
+        try:
+            probe = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", *burst_args,
+                 "-f", "lavfi", "-i", "color=size=16x16:rate=1",
+                 "-frames:v", "1", "-f", "null", "-"],
+                capture_output=True, timeout=StreamManager.ENCODER_PROBE_TIMEOUT
+            )
+            if probe.returncode == 0:
+                return burst_args
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        
+        logger.info("FFmpeg does not support -readrate_initial_burst, using -re")
+        return ("-re",)
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _video_encoder_args() -> tuple:
+        """
+        Pick the H.264 encoder once, preferring a hardware encoder that can actually encode.
+        Returns the filters to append to the frame rate filter and the encoder options.
+        """
+        try:
+            encoders = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-encoders"],
+                capture_output=True, timeout=StreamManager.ENCODER_PROBE_TIMEOUT
+            ).stdout
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not list FFmpeg encoders: {e}")
+            encoders = b""
+        
+        for encoder, (filters, options) in StreamManager.HW_ENCODERS.items():
+            if encoder.encode() not in encoders:
+                continue
+            
+            # Being compiled in does not mean a device is present, encode a single test frame
+            try:
+                probe = subprocess.run(
+                    ["ffmpeg", "-hide_banner", "-loglevel", "error",
+                     "-f", "lavfi", "-i", "color=size=256x256:rate=1",
+                     *(("-vf", filters.lstrip(",")) if filters else ()),
+                     "-frames:v", "1", "-c:v", encoder, *options, "-f", "null", "-"],
+                    capture_output=True, timeout=StreamManager.ENCODER_PROBE_TIMEOUT
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                continue
+            
+            if probe.returncode == 0:
+                logger.info(f"Using hardware encoder {encoder}")
+                return filters, ("-c:v", encoder, *options)
+        
+        logger.info("No hardware encoder available, using libx264")
+        return "", (
+            "-c:v", "libx264",
+            "-threads", str(StreamManager.THREADS_PER_STREAM),
+            "-pix_fmt", "yuv420p",
+            "-preset", "veryfast",
+            "-tune", "zerolatency",
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _ffmpeg_argv_template(output_fps: float) -> tuple:
+        """Build the FFmpeg arguments for a frame rate, with the input and output left empty"""
+        video_filters, video_encoder_args = StreamManager._video_encoder_args()
+        return (
+            "ffmpeg",
+            "-loglevel", "warning",  # Only what the stderr reaper acts on
+            "-probesize", "50M",
+            "-analyzeduration", "100M",
+            "-err_detect", "ignore_err",
+            *StreamManager._input_pacing_args(),
+            "-stream_loop", "-1",
+            "-fflags", "+genpts",
+            "-thread_queue_size", "1024",  # Smooth bursts between the demuxer and encoder
+            "-i", "",  # Input, set per stream
+            "-filter_complex_threads", str(StreamManager.THREADS_PER_STREAM),
+            "-filter_complex", f"[0:v]fps=fps={output_fps}{video_filters}[v_out]",
+            
+            "-map", "[v_out]",
+            "-an",  # Explicitly disable audio output
+            *video_encoder_args,
+            "-b:v", "2M",
+            "-maxrate", "2M",
+            "-bufsize", "4M",
+            "-g", str(int(output_fps * 2)),
+            "-flags", "+global_header",  # Required by the DASH segments when encoding for tee
+            
+            # DASH output and UDP output (to Internal Relay Port)
+            "-max_muxing_queue_size", "1024",
+            "-f", "tee",
+            ""  # FFMPEG_OUTPUT_INDEX
+        )
     
     @staticmethod
     def _validate_video_properties(video_data: dict) -> None:
@@ -133,89 +408,71 @@ class StreamManager:
         logger.info(f"[Stream {video_id}] Starting stream from {file_path}")
         logger.info(f"[Stream {video_id}] Relay Info: {relay_info}")
         
-        # Start TCP Relay
-        relay = TCPRelay(internal_port, external_port)
-        relay.start()
-        StreamManager._relays[video_id] = relay
-        logger.info(f"[Stream {video_id}] TCP Relay started")
+        # Start TCP Relay, or keep the running one when FFmpeg is restarted
+        # so connected AI clients stay connected
+        relay = StreamManager._relays.get(video_id)
+        if relay is not None and relay.is_alive():
+            logger.info(f"[Stream {video_id}] Reusing running TCP Relay")
+        else:
+            relay = TCPRelay(internal_port, external_port)
+            relay.start()
+            StreamManager._relays[video_id] = relay
+            logger.info(f"[Stream {video_id}] TCP Relay started")
         
         dash_dir = StreamManager.DASH_OUTPUT_DIR / str(video_id)
         dash_dir.mkdir(parents=True, exist_ok=True)
         dash_manifest = dash_dir / "manifest.mpd"
         
-        cmd = [
-            "ffmpeg",
-            "-probesize", "50M",
-            "-analyzeduration", "100M",
-            "-err_detect", "ignore_err",
-            "-re",
-            "-stream_loop", "-1",
-            "-fflags", "+genpts",
-            "-i", file_path,
-            "-filter_complex", f"[0:v]fps=fps={output_fps}[v_base]; [v_base]split=2[v_dash][v_udp]",
-            
-            "-map", "[v_dash]",
-            "-an",  # Explicitly disable audio output
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            "-preset", "veryfast",
-            "-tune", "zerolatency",
-            "-b:v", "2M",
-            "-maxrate", "2M",
-            "-bufsize", "4M",
-            "-g", str(int(output_fps * 2)),
-            "-f", "dash",
-            "-seg_duration", str(StreamManager.DASH_SEGMENT_DURATION),
-            "-window_size", str(StreamManager.DASH_WINDOW_SIZE),
-            "-extra_window_size", str(StreamManager.DASH_WINDOW_SIZE),
-            "-remove_at_exit", "1",
-            "-streaming", "1",
-            "-ldash", "1",
-            "-loglevel", "verbose",  # More detailed logging
-            str(dash_manifest),
-            
-            # UDP output (to Internal Relay Port)
-            "-map", "[v_udp]",
-            "-c:v", "libx264",
-            "-preset", "ultrafast",
-            "-tune", "zerolatency",
-            "-pix_fmt", "yuv420p",
-            "-f", "mpegts",
-            "-mpegts_copyts", "1",
-            f"udp://127.0.0.1:{internal_port}?pkt_size=1316"
-        ]
+        # A manifest left by a previous FFmpeg of this stream would pass the readiness check below
+        dash_manifest.unlink(missing_ok=True)
         
-        logger.debug(f"[Stream {video_id}] FFmpeg command: {' '.join(cmd)}")
+        # DASH and UDP outputs share a single encode through the tee muxer
+        dash_output = f"[{StreamManager._dash_tee_options()}]{dash_manifest}"
+        udp_output = f"[f=mpegts:mpegts_copyts=1]udp://127.0.0.1:{internal_port}?pkt_size=1316&buffer_size={TCPRelay.UDP_RCVBUF_SIZE}"
+        
+        # Only the input and output differ between streams of the same frame rate
+        template = StreamManager._ffmpeg_argv_template(output_fps)
+        cmd = list(template)
+        cmd[template.index("-i") + 1] = file_path
+        cmd[StreamManager.FFMPEG_OUTPUT_INDEX] = f"{dash_output}|{udp_output}"
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Stream {video_id}] FFmpeg command: {' '.join(cmd)}")
         
         process = subprocess.Popen(
             cmd,
-            stdout=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,  # Never read, a pipe could fill up and block FFmpeg
             stderr=subprocess.PIPE,
             stdin=subprocess.DEVNULL,
             bufsize=0,
-            preexec_fn=os.setsid
+            start_new_session=True  # Own session, terminal signals do not reach FFmpeg
         )
         
         logger.info(f"[Stream {video_id}] FFmpeg process started (PID: {process.pid})")
         
+        # Response fields are built once per stream, not on every status request
+        dash_info = {
+            "manifest_url": f"/dash/{video_id}/manifest.mpd"
+        }
+        
         storage.active_streams[video_id] = {
             'process': process,
             'start_time_ms': stream_start_time,
             'relay_info': relay_info,
+            'dash_info': dash_info,
             'dash_manifest': str(dash_manifest)
         }
         storage.videos[video_id]["is_streaming"] = True
         
-        stderr_thread = threading.Thread(
-            target=StreamManager._consume_stderr,
-            args=(video_id, process),
-            daemon=True
-        )
-        stderr_thread.start()
-        StreamManager._stderr_threads[video_id] = stderr_thread
+        # Stderr is drained until EOF by the shared reaper, which also keeps
+        # the process referenced so its pipe is not closed while registered
+        StreamManager._watch_stderr(video_id, process)
         
-        # Wait for stream to initialize and validate
-        time.sleep(3)
+        # Wait until the DASH manifest is written or the process exits,
+        # instead of a fixed startup delay
+        deadline = time.monotonic() + StreamManager.STARTUP_TIMEOUT
+        while process.poll() is None and not dash_manifest.exists() and time.monotonic() < deadline:
+            time.sleep(StreamManager.STARTUP_POLL_INTERVAL)
         
         if process.poll() is not None:
             logger.error(f"[Stream {video_id}] Process died immediately after start")
@@ -227,8 +484,6 @@ class StreamManager:
                 del storage.active_streams[video_id]
             if video_id in storage.videos:
                 storage.videos[video_id]["is_streaming"] = False
-            if video_id in StreamManager._stderr_threads:
-                del StreamManager._stderr_threads[video_id]
             raise HTTPException(
                 status_code=500, 
                 detail="FFmpeg process died immediately after start. Video file may be corrupted or invalid."
@@ -239,8 +494,7 @@ class StreamManager:
             logger.error(f"[Stream {video_id}] DASH manifest not created")
             # Terminate process and clean up
             try:
-                pgid = os.getpgid(process.pid)
-                os.killpg(pgid, signal.SIGTERM)
+                StreamManager._signal_process(process, signal.SIGTERM)
                 process.wait(timeout=5)
             except:
                 pass
@@ -252,8 +506,6 @@ class StreamManager:
                 del storage.active_streams[video_id]
             if video_id in storage.videos:
                 storage.videos[video_id]["is_streaming"] = False
-            if video_id in StreamManager._stderr_threads:
-                del StreamManager._stderr_threads[video_id]
             
             raise HTTPException(
                 status_code=500,
@@ -268,13 +520,61 @@ class StreamManager:
             "stream_start_time_ms": stream_start_time,
             "pid": process.pid,
             "relay": relay_info,
-            "dash": {
-                "manifest_url": f"/dash/{video_id}/manifest.mpd"
-            }
+            "dash": dash_info
         }
     
     @staticmethod
-    def start_stream(video_id: int) -> dict:
+    def _start_watchdog(video_id: int):
+        """Start the watchdog task of a stream, unless one is already running"""
+        watchdog = StreamManager._watchdogs.get(video_id)
+        if watchdog is None or watchdog.done():
+            StreamManager._watchdogs[video_id] = asyncio.create_task(StreamManager._watch_stream(video_id))
+    
+    @staticmethod
+    async def _watch_stream(video_id: int):
+        """Restart FFmpeg in place when it dies while clients are still connected"""
+        restarts = 0
+        started = time.monotonic()
+        
+        while True:
+            stream_data = storage.active_streams.get(video_id)
+            if stream_data is None:
+                return
+            await StreamManager._wait_process_exit(stream_data['process'])
+            
+            async with StreamManager._get_lock(video_id):
+                # Stream may have been stopped or restarted while waiting for the lock
+                stream_data = storage.active_streams.get(video_id)
+                if stream_data is None:
+                    return
+                
+                exit_code = stream_data['process'].poll()
+                if exit_code is None:
+                    continue
+                
+                if StreamManager._client_counts.get(video_id, 0) <= 0:
+                    return
+                
+                # Only crashes in quick succession count towards the restart limit
+                if time.monotonic() - started >= StreamManager.WATCHDOG_STABLE_PERIOD:
+                    restarts = 0
+                
+                if restarts >= StreamManager.WATCHDOG_MAX_RESTARTS:
+                    logger.error(f"[Stream {video_id}] FFmpeg died (exit code: {exit_code}), restart limit reached")
+                    return
+                
+                restarts += 1
+                logger.warning(f"[Stream {video_id}] FFmpeg died (exit code: {exit_code}), restarting ({restarts}/{StreamManager.WATCHDOG_MAX_RESTARTS})")
+                
+                try:
+                    await asyncio.to_thread(StreamManager._start_ffmpeg_process, video_id)
+                except Exception as e:
+                    logger.error(f"[Stream {video_id}] Failed to restart stream: {e}")
+                    return
+                started = time.monotonic()
+    
+    @staticmethod
+    async def start_stream(video_id: int) -> dict:
         """
         Start streaming for a video. 
         Always uses original video resolution and DASH format.
@@ -284,7 +584,7 @@ class StreamManager:
         
         lock = StreamManager._get_lock(video_id)
         
-        with lock:
+        async with lock:
             # Track client count
             if video_id not in StreamManager._client_counts:
                 StreamManager._client_counts[video_id] = 0
@@ -306,16 +606,14 @@ class StreamManager:
                         "stream_start_time_ms": stream_data['start_time_ms'],
                         "pid": process.pid,
                         "relay": stream_data['relay_info'],
-                        "dash": {
-                            "manifest_url": f"/dash/{video_id}/manifest.mpd"
-                        },
+                        "dash": stream_data['dash_info'],
                         "clients": StreamManager._client_counts[video_id]
                     }
                 else:
                     # Process died, clean up and restart
                     logger.warning(f"[Stream {video_id}] Found dead stream, cleaning up and restarting")
                     if video_id in StreamManager._relays:
-                        StreamManager._relays[video_id].stop()
+                        await asyncio.to_thread(StreamManager._relays[video_id].stop)
                         del StreamManager._relays[video_id]
                     del storage.active_streams[video_id]
                     storage.videos[video_id]["is_streaming"] = False
@@ -323,8 +621,9 @@ class StreamManager:
             
             # Start new stream
             try:
-                result = StreamManager._start_ffmpeg_process(video_id)
+                result = await asyncio.to_thread(StreamManager._start_ffmpeg_process, video_id)
                 result["clients"] = StreamManager._client_counts[video_id]
+                StreamManager._start_watchdog(video_id)
                 return result
             except HTTPException:
                 # Re-raise HTTP exceptions as-is
@@ -341,7 +640,7 @@ class StreamManager:
                 logger.error(f"[Stream {video_id}] Failed to start stream: {e}")
                 
                 if video_id in StreamManager._relays:
-                    StreamManager._relays[video_id].stop()
+                    await asyncio.to_thread(StreamManager._relays[video_id].stop)
                     del StreamManager._relays[video_id]
                 if video_id in storage.active_streams:
                     del storage.active_streams[video_id]
@@ -350,12 +649,40 @@ class StreamManager:
                 
                 raise HTTPException(status_code=500, detail=f"Failed to start stream: {str(e)}")
     
+    @staticmethod
+    async def _stop_relay(video_id: int, relay):
+        """Stop a stream's TCP relay"""
+        if relay is None:
+            return
+        
+        logger.info(f"[Stream {video_id}] Stopping TCP Relay")
+        await asyncio.to_thread(relay.stop)
+    
+    @staticmethod
+    async def _terminate_process(video_id: int, process):
+        """Kill a stream's FFmpeg process"""
+        # Nothing FFmpeg writes is kept after a stop, so no graceful shutdown is needed
+        try:
+            StreamManager._signal_process(process, signal.SIGKILL)
+            await asyncio.to_thread(process.wait)
+            logger.info(f"[Stream {video_id}] Process killed")
+        except (ProcessLookupError, OSError) as e:
+            logger.warning(f"[Stream {video_id}] Process cleanup error: {e}")
+    
+    @staticmethod
+    async def _close_websockets(video_id: int):
+        """Force close a stream's WebSockets"""
+        try:
+            await ws_manager.close_connections(video_id)
+        except Exception as e:
+            logger.warning(f"[Stream {video_id}] Failed to close websockets: {e}")
+    
     @staticmethod
     async def stop_stream(video_id: int) -> dict:
         """Stop streaming for a video (reference counting for multiple clients)"""
         lock = StreamManager._get_lock(video_id)
         
-        with lock:
+        async with lock:
             # Decrement client count
             if video_id in StreamManager._client_counts:
                 StreamManager._client_counts[video_id] -= 1
@@ -391,27 +718,18 @@ class StreamManager:
             
             logger.info(f"[Stream {video_id}] Stopping stream (PID: {process.pid})")
             
-            # Stop Relay
-            if video_id in StreamManager._relays:
-                logger.info(f"[Stream {video_id}] Stopping TCP Relay")
-                StreamManager._relays[video_id].stop()
-                del StreamManager._relays[video_id]
+            # Stop watchdog before the process, so it is not restarted
+            watchdog = StreamManager._watchdogs.pop(video_id, None)
+            if watchdog is not None:
+                watchdog.cancel()
             
-            # Terminate FFmpeg process
-            try:
-                pgid = os.getpgid(process.pid)
-                os.killpg(pgid, signal.SIGTERM)
-                
-                try:
-                    process.wait(timeout=5)
-                    logger.info(f"[Stream {video_id}] Process terminated cleanly")
-                except subprocess.TimeoutExpired:
-                    logger.warning(f"[Stream {video_id}] SIGTERM timeout, force killing")
-                    os.killpg(pgid, signal.SIGKILL)
-                    process.wait()
-                    logger.info(f"[Stream {video_id}] Process force killed")
-            except (ProcessLookupError, OSError) as e:
-                logger.warning(f"[Stream {video_id}] Process cleanup error: {e}")
+            # Stop relay, terminate FFmpeg and close WebSockets concurrently,
+            # they are independent of each other
+            await asyncio.gather(
+                StreamManager._stop_relay(video_id, StreamManager._relays.pop(video_id, None)),
+                StreamManager._terminate_process(video_id, process),
+                StreamManager._close_websockets(video_id)
+            )
             
             # Clean up storage - defensive checks
             if video_id in storage.active_streams:
@@ -419,46 +737,34 @@ class StreamManager:
             if video_id in storage.videos:
                 storage.videos[video_id]["is_streaming"] = False
             
-            # Clean up stderr thread
-            if video_id in StreamManager._stderr_threads:
-                stderr_thread = StreamManager._stderr_threads[video_id]
-                stderr_thread.join(timeout=2)
-                del StreamManager._stderr_threads[video_id]
-            
-            # Clean up DASH directory
+            # Clean up DASH directory, renamed first so the path can be reused
+            # by a new stream right away, and removed in the background
             dash_dir = StreamManager.DASH_OUTPUT_DIR / str(video_id)
             if dash_dir.exists():
-                import shutil
                 try:
-                    shutil.rmtree(dash_dir)
-                    logger.info(f"[Stream {video_id}] DASH directory cleaned up")
+                    removed_dir = dash_dir.with_name(f"{video_id}.removed.{time.time_ns()}")
+                    dash_dir.rename(removed_dir)
+                    StreamManager._schedule_dir_removal(removed_dir)
+                    logger.info(f"[Stream {video_id}] DASH directory scheduled for removal")
                 except Exception as e:
                     logger.warning(f"[Stream {video_id}] Could not remove DASH dir: {e}")
             
-            time.sleep(0.5)
-            
             logger.info(f"[Stream {video_id}] Stream stopped and cleaned up")
             
-            # Force close WebSockets
-            try:
-                await ws_manager.close_connections(video_id)
-            except Exception as e:
-                logger.warning(f"[Stream {video_id}] Failed to close websockets: {e}")
-
             return {
                 "video_id": video_id,
                 "status": "stopped"
             }
     
     @staticmethod
-    def get_stream_status(video_id: int) -> dict:
+    async def get_stream_status(video_id: int) -> dict:
         """Get current status of a stream"""
         if video_id not in storage.videos:
             raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
         
         lock = StreamManager._get_lock(video_id)
         
-        with lock:
+        async with lock:
             is_active = video_id in storage.active_streams
             
             result = {
@@ -479,7 +785,7 @@ class StreamManager:
                     
                     # Clean up storage - defensive checks
                     if video_id in StreamManager._relays:
-                        StreamManager._relays[video_id].stop()
+                        await asyncio.to_thread(StreamManager._relays[video_id].stop)
                         del StreamManager._relays[video_id]
                     if video_id in storage.active_streams:
                         del storage.active_streams[video_id]
@@ -500,15 +806,13 @@ class StreamManager:
                     result["stream_start_time_ms"] = stream_data['start_time_ms']
                     result["pid"] = process.pid
                     result["relay"] = stream_data['relay_info']
-                    result["dash"] = {
-                        "manifest_url": f"/dash/{video_id}/manifest.mpd"
-                    }
+                    result["dash"] = stream_data['dash_info']
                     if video_id in StreamManager._relays:
                         relay = StreamManager._relays[video_id]
                         result["relay_clients"] = relay.get_client_count()
                         result["relay_alive"] = relay.is_alive()
                         if not relay.is_alive():
-                            result["warning"] = "TCP Relay thread is dead! Check logs."
+                            result["warning"] = "TCP Relay is dead! Check logs."
             else:
                 # If it's not active, client count should be 0
                 if StreamManager._client_counts.get(video_id, 0) > 0:
@@ -523,21 +827,28 @@ class StreamManager:
         return result
     
     @staticmethod
-    def cleanup_all_streams():
+    async def _cleanup_stream(video_id: int):
+        """Stop a single stream on shutdown, regardless of tracked clients"""
+        try:
+            lock = StreamManager._get_lock(video_id)
+            async with lock:
+                # Set client count to 1 to ensure cleanup happens
+                # regardless of tracked clients
+                StreamManager._client_counts[video_id] = 1
+            await StreamManager.stop_stream(video_id)
+        except Exception as e:
+            logger.error(f"[Stream {video_id}] Error during cleanup: {e}")
+    
+    @staticmethod
+    async def cleanup_all_streams():
         """Cleanup all active streams (called on shutdown)"""
         logger.info("Cleaning up all active streams...")
-        video_ids = list(storage.active_streams.keys())
         
-        for video_id in video_ids:
-            try:
-                lock = StreamManager._get_lock(video_id)
-                with lock:
-                    # Set client count to 1 to ensure cleanup happens
-                    # regardless of tracked clients
-                    StreamManager._client_counts[video_id] = 1
-                StreamManager.stop_stream(video_id)
-            except Exception as e:
-                logger.error(f"[Stream {video_id}] Error during cleanup: {e}")
+        # Streams are independent, so stop them concurrently
+        await asyncio.gather(*(
+            StreamManager._cleanup_stream(video_id)
+            for video_id in list(storage.active_streams.keys())
+        ))
         
         logger.info("All streams cleaned up")
 
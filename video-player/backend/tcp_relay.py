@@ -1,149 +1,381 @@
 import socket
 import threading
-import time
+import os
 import select
 import logging
-import traceback
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from itertools import islice
 
 logger = logging.getLogger(__name__)
 
-class TCPRelay(threading.Thread):
+class RelayHub(threading.Thread):
+    """
+    Single epoll loop serving the sockets of every TCPRelay, instead of a thread per relay.
+    Linux only, like the TCP_CORK batching of the relays.
+    Sockets are only registered, used and closed on the hub thread.
+    """
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    # Longest wait for a function queued on the hub thread, in seconds
+    CALL_TIMEOUT = 5
+    
+    def __init__(self):
+        super().__init__(name="RelayHub")
+        self.daemon = True
+        self._epoll = select.epoll()
+        self._handlers = {} # File descriptor -> (relay, callback taking the epoll events)
+        self._calls = deque() # Functions waiting to run on the hub thread
+        
+        # Self-pipe for waking the epoll loop when calls are queued
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        
+        # Shared by all relays, the hub thread handles one batch of datagrams at a time
+        self.rxbuf = bytearray(TCPRelay.RECV_BUFFER_SIZE * TCPRelay.MAX_COALESCE)
+        self.rxview = memoryview(self.rxbuf)
+    
+    @staticmethod
+    def get() -> "RelayHub":
+        """Return the running hub, starting it on first use or when it died"""
+        with RelayHub._instance_lock:
+            if RelayHub._instance is None or not RelayHub._instance.is_alive():
+                RelayHub._instance = RelayHub()
+                RelayHub._instance.start()
+            return RelayHub._instance
+    
+    def run(self):
+        logger.info("Relay hub started")
+        while True:
+            for fd, events in self._epoll.poll():
+                if fd == self._wake_r:
+                    self._run_calls()
+                    continue
+                
+                # May have been unregistered by an earlier event of this batch
+                handler = self._handlers.get(fd)
+                if handler is None:
+                    continue
+                
+                relay, callback = handler
+                try:
+                    callback(events)
+                except Exception:
+                    # A failing relay is closed without affecting the others
+                    logger.exception("TCP Relay crashed")
+                    relay._close()
+    
+    def _run_calls(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        
+        while self._calls:
+            self._calls.popleft()()
+    
+    def call(self, func):
+        """Run func on the hub thread and return its result, raising if the hub does not run it in time"""
+        if threading.current_thread() is self:
+            return func()
+        if not self.is_alive():
+            raise RuntimeError("Relay hub is not running")
+        
+        future = Future()
+        
+        def run():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func())
+                except Exception as e:
+                    future.set_exception(e)
+        
+        self._calls.append(run)
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            pass # Pipe is full, the loop is already due to wake up
+        try:
+            return future.result(timeout=self.CALL_TIMEOUT)
+        except TimeoutError:
+            # Only give up if func will never run, once started it is waited for
+            if future.cancel():
+                raise
+            return future.result()
+    
+    def register(self, fd, eventmask, relay, callback):
+        # Edge-triggered registrations must be drained by the callback until they would block
+        self._epoll.register(fd, eventmask)
+        self._handlers[fd] = (relay, callback)
+    
+    def unregister(self, fd):
+        if self._handlers.pop(fd, None) is not None:
+            self._epoll.unregister(fd)
+
+class TCPRelay:
     """
     Relays video packets from a local internal UDP port to multiple external TCP clients.
     Allows clients to simply connect via TCP to receive the stream.
+    The sockets are served by the shared RelayHub loop.
     """
     
+    # Receive buffer of the internal UDP socket, absorbs bursts while clients are served.
+    # The kernel caps it at net.core.rmem_max, which has to be raised to at least this size
+    UDP_RCVBUF_SIZE = 12 * 1024 * 1024
+    
+    # Writes queued per client while its socket is not writable, oldest are dropped beyond this
+    CLIENT_BACKLOG_BATCHES = 128
+    
+    # Largest datagram read from the internal UDP socket
+    RECV_BUFFER_SIZE = 65536
+    
+    # Datagrams sent to a client in a single sendmsg call
+    MAX_COALESCE = 8
+    
     def __init__(self, internal_port: int, external_port: int):
-        super().__init__()
         self.internal_port = internal_port
         self.external_port = external_port
         self.running = False
-        self.clients = [] # List of client sockets
+        self.clients = {} # File descriptor -> client socket
         self.lock = threading.Lock()
-        self.daemon = True
-        
-    def run(self):
-        self.running = True
+        self._backlogs = {} # File descriptor -> deque of data waiting to be sent
+        self._hub = None
+        self._sock_in = None
+        self._sock_server = None
+    
+    def start(self):
         logger.info(f"TCP Relay starting: Internal UDP :{self.internal_port} -> External TCP :{self.external_port}")
         
-        sock_in = None
-        sock_server = None
-        
         try:
             # Socket for receiving video from FFmpeg (Internal UDP)
-            sock_in = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock_in.bind(('127.0.0.1', self.internal_port))
-            sock_in.setblocking(False)
+            self._sock_in = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock_in.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.UDP_RCVBUF_SIZE)
+            
+            # The requested size is silently capped, Linux reports double the size granted
+            rcvbuf_size = self._sock_in.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) // 2
+            if rcvbuf_size < self.UDP_RCVBUF_SIZE:
+                logger.warning(
+                    f"Internal UDP receive buffer capped at {rcvbuf_size} bytes, "
+                    f"set net.core.rmem_max to at least {self.UDP_RCVBUF_SIZE} to avoid dropping bursts"
+                )
+            self._sock_in.bind(('127.0.0.1', self.internal_port))
+            self._sock_in.setblocking(False)
             
             # Socket for accepting clients (External TCP)
-            sock_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock_server.bind(('0.0.0.0', self.external_port))
-            sock_server.listen(5)
-            sock_server.setblocking(False)
+            self._sock_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._sock_server.bind(('0.0.0.0', self.external_port))
+            self._sock_server.listen(5)
+            self._sock_server.setblocking(False)
+            
+            self._hub = RelayHub.get()
+            self._hub.call(self._register)
+            self.running = True
             
             logger.info(f"TCP Relay listening on 0.0.0.0:{self.external_port}")
+        except Exception:
+            logger.exception("TCP Relay crashed")
+            self._close()
+    
+    def _register(self):
+        # Registering reports data that arrived before, so nothing is missed
+        self._hub.register(self._sock_in.fileno(), select.EPOLLIN | select.EPOLLET, self, self._receive_all)
+        self._hub.register(self._sock_server.fileno(), select.EPOLLIN | select.EPOLLET, self, self._accept_all)
+    
+    def _receive_all(self, events):
+        # Receive all pending video data from FFmpeg, broadcasting it in batches of datagrams
+        rxview = self._hub.rxview
+        datagrams = []
+        corked = False
+        while True:
+            offset = len(datagrams) * self.RECV_BUFFER_SIZE
+            try:
+                n = self._sock_in.recv_into(rxview[offset:offset + self.RECV_BUFFER_SIZE])
+            except BlockingIOError:
+                break
+            except Exception as e:
+                logger.error(f"Error reading from internal UDP: {e}")
+                break
+            
+            if n:
+                datagrams.append(rxview[offset:offset + n])
+                if len(datagrams) == self.MAX_COALESCE:
+                    if not corked:
+                        # More batches are likely pending, let the kernel merge them into full segments
+                        self._set_cork(True)
+                        corked = True
+                    self._broadcast_to_clients(datagrams)
+                    datagrams = []
+        
+        if datagrams:
+            self._broadcast_to_clients(datagrams)
+        if corked:
+            # Uncorking sends the remainder right away
+            self._set_cork(False)
+    
+    def _set_cork(self, enabled):
+        for client in self.clients.values():
+            try:
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, enabled)
+            except OSError:
+                pass
+    
+    def _accept_all(self, events):
+        # Accept all pending TCP clients
+        while True:
+            try:
+                client_sock, addr = self._sock_server.accept()
+            except BlockingIOError:
+                return
+            except Exception as e:
+                logger.error(f"Error accepting TCP client: {e}")
+                return
             
-            while self.running:
-                # Build list of sockets to read from (UDP In + TCP Server)
-                read_list = [sock_in, sock_server]
+            try:
+                # Disable Nagle's algorithm for low latency
+                client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client_sock.setblocking(False)
                 
-                # Wait for activity
-                readable, _, _ = select.select(read_list, [], [], 1.0)
+                # Notified when the client becomes writable again after its buffer filled up
+                fd = client_sock.fileno()
+                self._hub.register(fd, select.EPOLLOUT | select.EPOLLET, self, partial(self._flush_client, fd))
                 
-                for s in readable:
-                    if s is sock_in:
-                        # Receive video data from FFmpeg
-                        try:
-                            data = s.recv(65536)
-                            if data:
-                                self._broadcast_to_clients(data)
-                        except Exception as e:
-                            logger.error(f"Error reading from internal UDP: {e}")
-                            
-                    elif s is sock_server:
-                        # Accept new TCP client
-                        try:
-                            client_sock, addr = sock_server.accept()
-                            # Disable Nagle's algorithm for low latency
-                            client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                            client_sock.setblocking(False)
-                            
-                            with self.lock:
-                                self.clients.append(client_sock)
-                            
-                            logger.info(f"New TCP client connected: {addr}")
-                        except Exception as e:
-                            logger.error(f"Error accepting TCP client: {e}")
-                            
-        except Exception as e:
-            error_msg = f"TCP Relay crashed: {e}\n{traceback.format_exc()}"
-            logger.error(error_msg)
-            with open("/tmp/relay_crash.log", "a") as f:
-                f.write(f"{time.ctime()}: {error_msg}\n")
-        finally:
-            self._close_all(sock_in, sock_server)
-            logger.info("TCP Relay stopped")
+                self._backlogs[fd] = deque()
+                with self.lock:
+                    self.clients[fd] = client_sock
+                
+                logger.info(f"New TCP client connected: {addr}")
+            except Exception as e:
+                logger.error(f"Error accepting TCP client: {e}")
+                client_sock.close()
+    
+    def _broadcast_to_clients(self, datagrams):
+        # Only called from the hub thread, which is also the only one mutating the client list.
+        # A slow client gets data queued instead of blocking the UDP reader or other clients.
+        # datagrams are views of the receive buffer, anything queued must be copied out of it.
+        if not self.clients:
+            return
+        
+        total = sum(len(datagram) for datagram in datagrams)
+        disconnected = []
+        for fd, client in self.clients.items():
+            backlog = self._backlogs[fd]
+            if backlog:
+                # Keep ordering behind data already waiting for this client
+                if len(backlog) >= self.CLIENT_BACKLOG_BATCHES:
+                    # Drop the oldest untouched batch, the head may be partially sent
+                    del backlog[1]
+                backlog.append(b''.join(datagrams))
+                continue
             
-    def _broadcast_to_clients(self, data):
-        with self.lock:
-            if not self.clients:
+            try:
+                sent = client.sendmsg(datagrams)
+            except BlockingIOError:
+                sent = 0
+            except (BrokenPipeError, ConnectionResetError):
+                disconnected.append(fd)
+                continue
+            except Exception as e:
+                logger.debug(f"Error sending to client: {e}")
+                disconnected.append(fd)
+                continue
+            
+            if sent < total:
+                backlog.append(memoryview(b''.join(datagrams))[sent:])
+        
+        for fd in disconnected:
+            self._remove_client(fd)
+    
+    def _flush_client(self, fd, events):
+        # Send data queued for a client that became writable again
+        client = self.clients.get(fd)
+        if client is None:
+            return
+        
+        if events & (select.EPOLLHUP | select.EPOLLERR):
+            self._remove_client(fd)
+            return
+        
+        backlog = self._backlogs[fd]
+        while backlog:
+            try:
+                sent = client.sendmsg(islice(backlog, self.MAX_COALESCE))
+            except BlockingIOError:
+                return
+            except Exception as e:
+                logger.debug(f"Error sending to client: {e}")
+                self._remove_client(fd)
                 return
-                
-            disconnected = []
-            for client in self.clients:
-                try:
-                    # We use sendall for TCP, but since it's non-blocking, 
-                    # we might need to handle partial sends or blocking.
-                    # For simplicity in this relay, we try to send.
-                    # Ideally, we should use select for writing too, but for video relay
-                    # dropping slow clients is often better than blocking everyone.
-                    # Let's try blocking send with timeout? No, that blocks main loop.
-                    # Let's just try send().
-                    client.sendall(data)
-                except (BrokenPipeError, ConnectionResetError):
-                    disconnected.append(client)
-                except BlockingIOError:
-                    # Client buffer full - drop packet for this client (congestion control)
-                    # Or disconnect them? For now, just skip (drop frame)
-                    pass
-                except Exception as e:
-                    logger.debug(f"Error sending to client: {e}")
-                    disconnected.append(client)
             
-            for client in disconnected:
-                self._remove_client(client)
-
-    def _remove_client(self, client):
+            # Drop what was written, keeping the unsent tail of a partially sent entry
+            while sent:
+                data = backlog[0]
+                if sent < len(data):
+                    backlog[0] = memoryview(data)[sent:]
+                    return
+                sent -= len(data)
+                backlog.popleft()
+    
+    def _remove_client(self, fd):
+        self._backlogs.pop(fd, None)
+        with self.lock:
+            client = self.clients.pop(fd, None)
+        
+        if client is None:
+            return
+        self._hub.unregister(fd)
         try:
             client.close()
         except:
             pass
-        if client in self.clients:
-            self.clients.remove(client)
-            logger.info("TCP client disconnected")
-
-    def _close_all(self, sock_in, sock_server):
-        if sock_in:
-            try: sock_in.close()
-            except: pass
-        if sock_server:
-            try: sock_server.close()
+        logger.info("TCP client disconnected")
+    
+    def _close(self):
+        # Runs on the hub thread once registered, sockets are unregistered before closing
+        was_running = self.running
+        self.running = False
+        
+        for sock in (self._sock_in, self._sock_server):
+            if sock is None:
+                continue
+            if self._hub is not None and sock.fileno() != -1:
+                self._hub.unregister(sock.fileno())
+            try: sock.close()
             except: pass
+        self._sock_in = None
+        self._sock_server = None
         
         with self.lock:
-            for client in self.clients:
-                try: client.close()
-                except: pass
+            clients = list(self.clients.items())
             self.clients.clear()
-
-    def stop(self):
-        self.running = False
-        self.join()
+        for fd, client in clients:
+            self._hub.unregister(fd)
+            try: client.close()
+            except: pass
+        self._backlogs.clear()
         
+        if was_running:
+            logger.info("TCP Relay stopped")
+    
+    def stop(self):
+        if self._hub is not None:
+            try:
+                self._hub.call(self._close)
+                return
+            except Exception as e:
+                # The hub is gone or stuck and never ran _close, its sockets are closed from here instead
+                logger.warning(f"Relay hub did not stop the relay: {e!r}")
+        self._close()
+    
     def get_client_count(self):
         with self.lock:
             return len(self.clients)
     
     def is_alive(self):
-        return super().is_alive()
+        return self.running and self._hub.is_alive()
@@ -1,17 +1,26 @@
 from fastapi import HTTPException, UploadFile
 from datetime import datetime
 from pathlib import Path
-from storage import storage
+from storage import storage, VideoBBoxes
 from models import VideoInfo
+import asyncio
+import shutil
 import subprocess
 import json
 import logging
+import os
 
 # Variables
 logger = logging.getLogger(__name__)
 
 class VideoManager:
     """Handles video file operations and metadata"""
+    
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes copied at a time when saving uploads
+    
+    # Concurrent ffprobe runs, so simultaneous uploads do not fork one process each at once
+    _probe_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+    _video_infos = {} # Validated VideoInfo per video, reused while the video is unchanged
 
     @staticmethod
     def _get_video_properties(file_path: str) -> dict:
@@ -25,6 +34,10 @@ class VideoManager:
             "-select_streams", "v:0",
             "-show_entries", "stream=width,height,avg_frame_rate",
             "-of", "json",
+            # Only the headers are needed, bound how much of the file is read
+            "-probesize", "5M",
+            "-analyzeduration", "5M",
+            "-read_intervals", "%+1",
             file_path
         ]
         
@@ -90,26 +103,35 @@ class VideoManager:
         video_name = name or file.filename
         file_path = storage.video_storage_path / f"{video_id}.mp4"
         
+        # Staged under a temporary name, so the final path only ever holds a complete, valid video
+        tmp_path = file_path.with_suffix(".mp4.tmp")
+        
         # Save uploaded file
         try:
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            # Copied in chunks in a worker thread, the upload is never held in memory whole
+            with open(tmp_path, "wb") as f:
+                await asyncio.to_thread(shutil.copyfileobj, file.file, f, VideoManager.UPLOAD_CHUNK_SIZE)
+                await asyncio.to_thread(os.fsync, f.fileno())
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
 
-        # Get video properties (strict validation, no fallbacks)
+        # Get video properties (strict validation, no fallbacks), probed in a
+        # worker thread so concurrent uploads are probed in parallel
         try:
-            properties = VideoManager._get_video_properties(str(file_path))
+            async with VideoManager._probe_semaphore:
+                properties = await asyncio.to_thread(VideoManager._get_video_properties, str(tmp_path))
         except ValueError as e:
             # Clean up uploaded file if property extraction fails
-            if file_path.exists():
-                file_path.unlink()
+            tmp_path.unlink(missing_ok=True)
             raise HTTPException(
                 status_code=400, 
                 detail=f"Invalid video file: {str(e)}"
             )
         
+        # Atomic rename, the video is only visible under its final name once validated
+        tmp_path.replace(file_path)
+        
         # Store video metadata
         video_data = {
             "id": video_id,
@@ -123,7 +145,7 @@ class VideoManager:
         }
         
         storage.videos[video_id] = video_data
-        storage.bboxes[video_id] = {}
+        storage.bboxes[video_id] = VideoBBoxes()
         
         logger.info(f"Video {video_id} created: {video_name} ({properties['width']}x{properties['height']} @ {properties['fps']:.2f} fps)")
         
@@ -142,7 +164,17 @@ class VideoManager:
         # Create a snapshot to avoid race conditions during iteration
         # when other threads modify storage.videos
         videos_snapshot = list(storage.videos.values())
-        return [VideoInfo(**v) for v in videos_snapshot]
+        
+        # Only is_streaming changes after a video is created, so a VideoInfo
+        # is validated again only when that flag differs
+        video_infos = []
+        for video_data in videos_snapshot:
+            info = VideoManager._video_infos.get(video_data["id"])
+            if info is None or info.is_streaming != video_data["is_streaming"]:
+                info = VideoInfo(**video_data)
+                VideoManager._video_infos[video_data["id"]] = info
+            video_infos.append(info)
+        return video_infos
     
     @staticmethod
     def delete_video(video_id: int) -> dict:
@@ -171,6 +203,7 @@ class VideoManager:
             file_path.unlink()
         
         # Remove from storage
+        VideoManager._video_infos.pop(video_id, None)
         del storage.videos[video_id]
         if video_id in storage.bboxes:
             del storage.bboxes[video_id]
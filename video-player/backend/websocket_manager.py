@@ -1,7 +1,7 @@
-from fastapi import WebSocket, WebSocketDisconnect
+from fastapi import WebSocket
 from typing import Dict, Set
-import json
 import asyncio
+import msgspec
 from storage import storage
 
 class ConnectionManager:
@@ -40,17 +40,22 @@ class ConnectionManager:
         
         message['stream_start_time_ms'] = stream_start_time_ms
         
-        message_json = json.dumps(message)
+        # Serialize once for all clients, kept as a text frame since the viewer
+        # parses messages with JSON.parse
+        message_json = msgspec.json.encode(message).decode()
         
-        disconnected = set()
-        for connection in self.active_connections[video_id].copy():
-            try:
-                await connection.send_text(message_json)
-            except WebSocketDisconnect:
-                disconnected.add(connection)
-            except Exception:
-                disconnected.add(connection)
+        connections = list(self.active_connections[video_id])
+        results = await asyncio.gather(
+            *(connection.send_text(message_json) for connection in connections),
+            return_exceptions=True
+        )
         
+        disconnected = [
+            connection for connection, result in zip(connections, results)
+            if isinstance(result, Exception)
+        ]
+        
+        if disconnected and video_id in self.active_connections:
             for conn in disconnected:
                 self.active_connections[video_id].discard(conn)
     
@@ -58,12 +63,11 @@ class ConnectionManager:
         """Forcefully close all connections for a video"""
         async with self._lock:
             if video_id in self.active_connections:
-                connections = list(self.active_connections[video_id])
-                for connection in connections:
-                    try:
-                        await connection.close()
-                    except Exception:
-                        pass
+                # Close all at once, failures are ignored as the connections are dropped anyway
+                await asyncio.gather(
+                    *(connection.close() for connection in self.active_connections[video_id]),
+                    return_exceptions=True
+                )
                 if video_id in self.active_connections:
                     del self.active_connections[video_id]
     
@@ -82,9 +86,7 @@ class ConnectionManager:
                 "video_id": video_id,
                 "stream_start_time_ms": stream_data['start_time_ms'],
                 "tcp": tcp_info,
-                "dash": {
-                    "manifest_url": f"/dash/{video_id}/manifest.mpd"
-                },
+                "dash": stream_data['dash_info'],
                 "message": "Connected to stream"
             })
 
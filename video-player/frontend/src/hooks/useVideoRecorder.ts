@@ -107,12 +107,14 @@ export const useVideoRecorder = ({
 
                 // Configure encoder
                 // Use Baseline Profile (avc1.42001e) to avoid B-frames
+                // Realtime mode favors encoding speed over compression, so the encoder keeps up with the live feed
                 const config: VideoEncoderConfig = {
                     codec: 'avc1.42001e',
                     width: originalWidth,
                     height: originalHeight,
                     bitrate: BITRATE,
                     framerate: FPS,
+                    latencyMode: 'realtime',
                 };
 
                 // Check support
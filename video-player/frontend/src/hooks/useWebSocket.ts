@@ -1,6 +1,6 @@
 import { useEffect, useRef, useState, useCallback } from 'react';
 import { getBackendUrl } from '../api/client';
-import type { BBoxMessage } from '../types';
+import type { BBoxBatchMessage, BBoxMessage } from '../types';
 
 export const useWebSocket = (videoId: number | null, onDisconnect?: () => void) => {
     const [isConnected, setIsConnected] = useState(false);
@@ -25,14 +25,23 @@ export const useWebSocket = (videoId: number | null, onDisconnect?: () => void)
             try {
                 const data = JSON.parse(event.data);
 
-                if (data.type === 'bboxes') {
-                    // Add to buffer
+                if (data.type === 'bboxes_batch') {
+                    // Add each PTS group to buffer
                     // We keep a buffer of recent messages to sync with video
-                    bboxBufferRef.current.push(data);
+                    const batch = data as BBoxBatchMessage;
+                    for (const group of batch.groups) {
+                        bboxBufferRef.current.push({
+                            pts: group.pts,
+                            bboxes: group.bboxes,
+                            video_id: batch.video_id,
+                            timestamp: batch.timestamp,
+                        });
+                    }
 
                     // Limit buffer size (e.g., keep last 500 messages)
-                    if (bboxBufferRef.current.length > 500) {
-                        bboxBufferRef.current.shift();
+                    const overflow = bboxBufferRef.current.length - 500;
+                    if (overflow > 0) {
+                        bboxBufferRef.current.splice(0, overflow);
                     }
                 } else if (data.type === 'stream_info') {
                     // Stream info received
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { listVideos, uploadVideo, deleteVideo, startStream, stopStream, getStreamStatus } from '../api/streams';
 import type { Video } from '../types';
 import { Play, Square, Trash2, Info, Upload, RefreshCw, Film, Activity } from 'lucide-react';
@@ -6,6 +6,15 @@ import clsx from 'clsx';
 import toast from 'react-hot-toast';
 import { Modal } from '../components/Modal';
 
+// Whether a fetched list would render the same as the current one
+const sameVideos = (a: Video[], b: Video[]) =>
+    a.length === b.length &&
+    a.every((video, i) =>
+        video.id === b[i].id &&
+        video.name === b[i].name &&
+        video.is_streaming === b[i].is_streaming
+    );
+
 export const Management: React.FC = () => {
     const [videos, setVideos] = useState<Video[]>([]);
     const [loading, setLoading] = useState(false);
@@ -21,12 +30,17 @@ export const Management: React.FC = () => {
     const [uploadName, setUploadName] = useState('');
     const [streamInfo, setStreamInfo] = useState<string | null>(null);
 
-    const fetchVideos = async () => {
+    // Requests to the video list that have not completed yet
+    const fetchesInFlight = useRef(0);
+
+    const fetchVideos = async (showLoading = true) => {
+        fetchesInFlight.current++;
         try {
-            setLoading(true);
+            if (showLoading) setLoading(true);
             const data = await listVideos();
             if (Array.isArray(data)) {
-                setVideos(data);
+                // Keep the current list when nothing changed, so the table is not re-rendered
+                setVideos(prev => (sameVideos(prev, data) ? prev : data));
             } else {
                 console.error('Received invalid videos data:', data);
                 setVideos([]);
@@ -35,13 +49,18 @@ export const Management: React.FC = () => {
             console.error('Failed to fetch videos', error);
             toast.error('Failed to fetch videos');
         } finally {
-            setLoading(false);
+            fetchesInFlight.current--;
+            if (showLoading) setLoading(false);
         }
     };
 
     useEffect(() => {
         fetchVideos();
-        const interval = setInterval(fetchVideos, 5000);
+        // Background refresh, without toggling the loading indicator. Skipped while
+        // a request is still pending, so a slow backend does not pile up requests
+        const interval = setInterval(() => {
+            if (fetchesInFlight.current === 0) fetchVideos(false);
+        }, 5000);
         return () => clearInterval(interval);
     }, []);
 
@@ -156,7 +175,7 @@ export const Management: React.FC = () => {
                         <Upload className="w-4 h-4 mr-2" />
                         Upload Video
                     </button>
-                    <button onClick={fetchVideos} className="btn btn-secondary">
+                    <button onClick={() => fetchVideos()} className="btn btn-secondary">
                         <RefreshCw className={clsx("w-4 h-4 mr-2", loading && "animate-spin")} />
                         Refresh
                     </button>
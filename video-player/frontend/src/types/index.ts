@@ -30,6 +30,16 @@ export interface BBoxMessage {
     timestamp?: number;
 }
 
+export interface BBoxBatchMessage {
+    type: 'bboxes_batch';
+    video_id: number;
+    timestamp: number;
+    groups: {
+        pts: number;
+        bboxes: BBox[];
+    }[];
+}
+
 export interface StreamInfoMessage {
     type: 'stream_info';
     // Add fields if needed
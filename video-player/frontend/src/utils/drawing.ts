@@ -9,6 +9,54 @@ export const COLORS: Record<string, string> = {
     default: '#00C8C8' // Cyan
 };
 
+// Resolved color per class name, so names are not lowercased for every box on every frame
+const classColors = new Map<string, string>();
+
+const getClassColor = (className: string): string => {
+    let color = classColors.get(className);
+    if (color === undefined) {
+        color = COLORS[className.toLowerCase()] || COLORS.default;
+        classColors.set(className, color);
+    }
+    return color;
+};
+
+interface Corners {
+    originalWidth: number;
+    x1: number;
+    y1: number;
+    x2: number;
+    y2: number;
+}
+
+// Decoded corners per bbox, a bbox stays on screen for several frames
+// and is only decoded the first time it is drawn
+const decodedCorners = new WeakMap<BBox, Corners>();
+
+const decodeCorners = (bbox: BBox, originalWidth: number): Corners => {
+    const cached = decodedCorners.get(bbox);
+    if (cached && cached.originalWidth === originalWidth) return cached;
+
+    // Convert 1D indices to 2D coordinates, one division per corner
+    const topLeft = bbox.top_left_corner;
+    const bottomRight = bbox.bottom_right_corner;
+    const y1 = Math.floor(topLeft / originalWidth);
+    const y2 = Math.floor(bottomRight / originalWidth);
+    const corners = {
+        originalWidth,
+        x1: topLeft - y1 * originalWidth,
+        y1,
+        x2: bottomRight - y2 * originalWidth,
+        y2
+    };
+
+    decodedCorners.set(bbox, corners);
+    return corners;
+};
+
+const LABEL_FONT = 'bold 14px Arial';
+const LABEL_TEXT_HEIGHT = 14;
+
 export const drawBBoxes = (
     ctx: CanvasRenderingContext2D,
     bboxes: BBox[],
@@ -26,46 +74,43 @@ export const drawBBoxes = (
     const scaleY = height / originalHeight;
 
     ctx.save();
+    ctx.lineWidth = 3;
+    ctx.font = LABEL_FONT; // Parsing the font is not free, set it once for all labels
 
-    bboxes.forEach(bbox => {
-        if (bbox.confidence < minConfidence) return;
+    for (let i = 0; i < bboxes.length; i++) {
+        const bbox = bboxes[i];
+        if (bbox.confidence < minConfidence) continue;
 
-        const color = COLORS[bbox.class_name.toLowerCase()] || COLORS.default;
-
-        // Convert 1D indices to 2D coordinates
-        const y1_orig = Math.floor(bbox.top_left_corner / originalWidth);
-        const x1_orig = bbox.top_left_corner % originalWidth;
-        const y2_orig = Math.floor(bbox.bottom_right_corner / originalWidth);
-        const x2_orig = bbox.bottom_right_corner % originalWidth;
+        const color = getClassColor(bbox.class_name);
 
         // Scale to current display size
-        const x1 = x1_orig * scaleX;
-        const y1 = y1_orig * scaleY;
-        const x2 = x2_orig * scaleX;
-        const y2 = y2_orig * scaleY;
+        const corners = decodeCorners(bbox, originalWidth);
+        const x1 = corners.x1 * scaleX;
+        const y1 = corners.y1 * scaleY;
+        const x2 = corners.x2 * scaleX;
+        const y2 = corners.y2 * scaleY;
 
         const w = x2 - x1;
         const h = y2 - y1;
 
+        // Skip degenerate boxes and boxes entirely outside the canvas
+        if (w <= 0 || h <= 0 || x1 >= width || y1 >= height || x2 < 0 || y2 < 0) continue;
+
         // Draw Box
         ctx.strokeStyle = color;
-        ctx.lineWidth = 3;
         ctx.strokeRect(x1, y1, w, h);
 
         // Draw Label Background
         const label = `${bbox.class_name} ${bbox.confidence.toFixed(2)}`;
-        ctx.font = 'bold 14px Arial';
-        const textMetrics = ctx.measureText(label);
-        const textWidth = textMetrics.width;
-        const textHeight = 14;
+        const textWidth = ctx.measureText(label).width;
 
         ctx.fillStyle = color;
-        ctx.fillRect(x1, y1 - textHeight - 8, textWidth + 8, textHeight + 8);
+        ctx.fillRect(x1, y1 - LABEL_TEXT_HEIGHT - 8, textWidth + 8, LABEL_TEXT_HEIGHT + 8);
 
         // Draw Text
         ctx.fillStyle = 'white';
         ctx.fillText(label, x1 + 4, y1 - 6);
-    });
+    }
 
     ctx.restore();
 };